@@ -1,28 +1,58 @@
 import asyncio
-import datetime
+import atexit
+import hashlib
+import io
+import json
 import logging
+import logging.handlers
 import os
-from typing import Iterable, Optional
+import queue
+import time
+from collections import deque
+from itertools import chain
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.enums import ChatType
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.enums import ChatType, MessageEntityType
 from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
 from aiogram.filters import Command, CommandStart
+from aiogram.methods import GetChatAdministrators
 from aiogram.types import (
     BotCommand,
     BotCommandScopeAllChatAdministrators,
     BotCommandScopeAllGroupChats,
     BotCommandScopeAllPrivateChats,
     Chat,
-    ChatMember,
     ErrorEvent,
     Message,
     User,
 )
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Route log records through a queue so handlers never block on stderr I/O."""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # дописываем хвост очереди при выходе
+    return listener
+
+
 load_dotenv()
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 OWNER_ID_RAW = os.getenv("OWNER_ID")
@@ -32,64 +62,203 @@ except ValueError:
     OWNER_ID = None
     logger.warning("OWNER_ID задан, но не является числом: %s", OWNER_ID_RAW)
 
+POLLING_RETRY_MIN_DELAY = 5
+POLLING_RETRY_MAX_DELAY = 60
+
+COMMANDS_CACHE_PATH = Path(os.getenv("COMMANDS_CACHE_PATH", ".commands_cache.json"))
+
+NOTIFY_FLUSH_INTERVAL = 2
+NOTIFY_BATCH_LIMIT = 10
+NOTIFY_MAX_LENGTH = 4000  # лимит Telegram на сообщение — 4096 символов
+NOTIFY_NOTE_RESERVE = 64  # место под приписку «…и еще N уведомлений»
+NOTIFY_QUEUE_LIMIT = 100
+NOTIFY_SHUTDOWN_TIMEOUT = 10
+
+# deque, а не asyncio.Queue: при сборке пачки нужно заглянуть в следующий
+# отчет, не забирая его, чтобы не превысить лимит длины сообщения.
+_notify_queue: deque[str] = deque()
+_notify_pending = asyncio.Event()
+
+ADMINS_SHOWN_LIMIT = 6
+
+UPDATE_PREVIEW_LIMIT = 1500  # байт JSON update в отчете об ошибке
+
+CHAT_INFO_CACHE_TTL = 30
+_CHAT_INFO_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=CHAT_INFO_CACHE_TTL)
+_CHAT_INFO_IN_FLIGHT: dict[tuple, "asyncio.Task[tuple[str, bool]]"] = {}
+
+
+_last_stamp: tuple[int, str] = (-1, "")
+
+
+def _utcstamp() -> str:
+    """UTC timestamp for reports, formatted at most once per second."""
+    global _last_stamp
+    now = int(time.time())
+    if now != _last_stamp[0]:
+        _last_stamp = (now, time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(now)))
+    return _last_stamp[1]
+
+
+_YN_MAP = {True: "да", False: "нет", None: "неизвестно"}
+
 
 def yes_no(value: Optional[bool]) -> str:
-    if value is True:
-        return "да"
-    if value is False:
-        return "нет"
-    return "неизвестно"
+    return _YN_MAP.get(value, "неизвестно")
+
 
+def notify_owner(text: str) -> None:
+    """Queue a short notification for the owner if OWNER_ID is configured.
 
-async def notify_owner(bot: Bot, text: str) -> None:
-    """Send a short notification to the owner if OWNER_ID is configured."""
+    Сообщения копятся в очереди и отправляются пачкой фоновой задачей
+    (см. notify_owner_worker), чтобы шторм ошибок не съедал лимиты Bot API.
+    """
     if not OWNER_ID:
         return
+    if len(_notify_queue) >= NOTIFY_QUEUE_LIMIT:
+        logger.warning("Очередь уведомлений владельцу переполнена, сообщение отброшено")
+        return
+    _notify_queue.append(text)
+    _notify_pending.set()
+
+
+def _take_notify_batch() -> list[str]:
+    """Pop as many queued reports as fit into one message (at least one)."""
+    budget = NOTIFY_MAX_LENGTH - NOTIFY_NOTE_RESERVE
+    reports = [_notify_queue.popleft()]
+    length = len(reports[0])
+    while len(reports) < NOTIFY_BATCH_LIMIT and _notify_queue:
+        next_length = length + 2 + len(_notify_queue[0])  # 2 — разделитель "\n\n"
+        if next_length > budget:
+            break
+        reports.append(_notify_queue.popleft())
+        length = next_length
+    if not _notify_queue:
+        _notify_pending.clear()
+    return reports
+
+
+async def _send_notify_batch(bot: Bot, reports: list[str]) -> None:
+    text = "\n\n".join(reports)
+    budget = NOTIFY_MAX_LENGTH - NOTIFY_NOTE_RESERVE
+    if len(text) > budget:
+        # Сюда попадает только одиночный отчет, который длиннее лимита сам по себе.
+        text = text[: budget - 1] + "…"
+    skipped = len(_notify_queue)
+    if skipped:
+        text += f"\n\n…и еще {skipped} уведомлений в очереди"
+
     try:
         await bot.send_message(chat_id=OWNER_ID, text=text)
     except Exception:  # noqa: BLE001 - важно не упасть в цикле уведомлений
         logger.exception("Не удалось отправить уведомление владельцу")
 
 
+async def notify_owner_worker(bot: Bot) -> None:
+    """Drain queued owner notifications and send them as merged messages.
+
+    Отчеты, не влезшие в одно сообщение, остаются в очереди до следующей
+    отправки. При отмене задачи (остановка бота) все, что осталось,
+    досылается без паузы; main ограничивает это время таймаутом.
+    """
+    reports: list[str] = []
+    try:
+        while True:
+            await _notify_pending.wait()
+            # Даем ошибкам из той же пачки успеть попасть в очередь.
+            await asyncio.sleep(NOTIFY_FLUSH_INTERVAL)
+            reports = _take_notify_batch()
+            await _send_notify_batch(bot, reports)
+            reports = []
+    except asyncio.CancelledError:
+        if reports:
+            await _send_notify_batch(bot, reports)
+        while _notify_queue:
+            await _send_notify_batch(bot, _take_notify_batch())
+        raise
+
+
+def _attr_or_none(name: str) -> Callable[[object], Any]:
+    # Часть полей User появилась в Bot API позже, чем в установленном aiogram,
+    # поэтому отсутствующий атрибут трактуем как None.
+    return lambda obj: getattr(obj, name, None)
+
+
+def _username(user: User) -> str:
+    return f"@{user.username}" if user.username else "нет"
+
+
+# (подпись, getter, выводить как да/нет)
+_USER_FIELDS: tuple[tuple[str, Callable[[User], Any], bool], ...] = (
+    ("ID", attrgetter("id"), False),
+    ("Bot", attrgetter("is_bot"), True),
+    ("Имя", attrgetter("full_name"), False),
+    ("Username", _username, False),
+    ("Язык", attrgetter("language_code"), False),
+    ("Premium", _attr_or_none("is_premium"), True),
+    ("Scam", _attr_or_none("is_scam"), True),
+    ("Fake", _attr_or_none("is_fake"), True),
+    ("Support", _attr_or_none("is_support"), True),
+    ("Добавлен в меню вложений", _attr_or_none("added_to_attachment_menu"), True),
+    ("Может присоединяться к группам", _attr_or_none("can_join_groups"), True),
+    ("Может читать все сообщения групп", _attr_or_none("can_read_all_group_messages"), True),
+    ("Поддерживает inline", _attr_or_none("supports_inline_queries"), True),
+    ("Can connect to business", _attr_or_none("can_connect_to_business"), True),
+    ("Has main web app", _attr_or_none("has_main_web_app"), True),
+)
+
+
 def format_user(user: User) -> str:
     """Render as much info as Bot API exposes for the User object."""
 
-    fields: list[str] = [
-        f"ID: {user.id}",
-        f"Bot: {yes_no(user.is_bot)}",
-        f"Имя: {user.full_name}",
-        f"Username: @{user.username}" if user.username else "Username: нет",
-        f"Язык: {user.language_code or 'неизвестно'}",
-        f"Premium: {yes_no(getattr(user, 'is_premium', None))}",
-        f"Scam: {yes_no(getattr(user, 'is_scam', None))}",
-        f"Fake: {yes_no(getattr(user, 'is_fake', None))}",
-        f"Support: {yes_no(getattr(user, 'is_support', None))}",
-        f"Добавлен в меню вложений: {yes_no(getattr(user, 'added_to_attachment_menu', None))}",
-        f"Может присоединяться к группам: {yes_no(getattr(user, 'can_join_groups', None))}",
-        f"Может читать все сообщения групп: {yes_no(getattr(user, 'can_read_all_group_messages', None))}",
-        f"Поддерживает inline: {yes_no(getattr(user, 'supports_inline_queries', None))}",
-        f"Can connect to business: {yes_no(getattr(user, 'can_connect_to_business', None))}",
-        f"Has main web app: {yes_no(getattr(user, 'has_main_web_app', None))}",
-    ]
+    fields: list[str] = []
+    for label, get, is_bool in _USER_FIELDS:
+        value = get(user)
+        if is_bool:
+            rendered = yes_no(value)
+        else:
+            rendered = value if value is not None else "неизвестно"
+        fields.append(f"{label}: {rendered}")
 
-    if getattr(user, "emoji_status_custom_emoji_id", None):
-        fields.append(f"Emoji статус: {user.emoji_status_custom_emoji_id}")
-    if getattr(user, "personal_chat_id", None):
-        fields.append(f"Personal chat ID: {user.personal_chat_id}")
+    emoji_status = getattr(user, "emoji_status_custom_emoji_id", None)
+    if emoji_status:
+        fields.append(f"Emoji статус: {emoji_status}")
+    personal_chat_id = getattr(user, "personal_chat_id", None)
+    if personal_chat_id:
+        fields.append(f"Personal chat ID: {personal_chat_id}")
 
     return "\n".join(fields)
 
 
-def format_admins(admins: Iterable[ChatMember], limit: int = 6) -> str:
-    admins = list(admins)
-    if not admins:
+def format_admins(total: int, shown: Sequence[User]) -> str:
+    if not total:
         return "Администраторы: недоступно"
 
-    shown = admins[:limit]
-    rendered = ", ".join(f"{m.user.full_name} (id {m.user.id})" for m in shown)
-    if len(admins) > limit:
-        rendered += f", и еще {len(admins) - limit}"
-    return f"Администраторы ({len(admins)}): {rendered}"
+    rendered = ", ".join(f"{u.full_name} (id {u.id})" for u in shown)
+    if total > len(shown):
+        rendered += f", и еще {total - len(shown)}"
+    return f"Администраторы ({total}): {rendered}"
+
+
+_PERM_FIELDS = tuple(
+    (attrgetter(attr), label)
+    for attr, label in (
+        ("can_send_messages", "сообщения"),
+        ("can_send_audios", "аудио"),
+        ("can_send_documents", "документы"),
+        ("can_send_photos", "фото"),
+        ("can_send_videos", "видео"),
+        ("can_send_video_notes", "видео-заметки"),
+        ("can_send_voice_notes", "голосовые"),
+        ("can_send_polls", "опросы"),
+        ("can_send_other_messages", "другое"),
+        ("can_add_web_page_previews", "превью ссылок"),
+        ("can_change_info", "изменять инфо"),
+        ("can_invite_users", "приглашать"),
+        ("can_pin_messages", "пинить"),
+        ("can_manage_topics", "управлять топиками"),
+    )
+)
 
 
 def format_permissions(chat: Chat) -> str:
@@ -97,46 +266,19 @@ def format_permissions(chat: Chat) -> str:
     if not perms:
         return "Разрешения по умолчанию: недоступно"
 
-    allowed = []
-    mapping = {
-        "can_send_messages": "сообщения",
-        "can_send_audios": "аудио",
-        "can_send_documents": "документы",
-        "can_send_photos": "фото",
-        "can_send_videos": "видео",
-        "can_send_video_notes": "видео-заметки",
-        "can_send_voice_notes": "голосовые",
-        "can_send_polls": "опросы",
-        "can_send_other_messages": "другое",
-        "can_add_web_page_previews": "превью ссылок",
-        "can_change_info": "изменять инфо",
-        "can_invite_users": "приглашать",
-        "can_pin_messages": "пинить",
-        "can_manage_topics": "управлять топиками",
-    }
-    for attr, label in mapping.items():
-        if getattr(perms, attr, None):
-            allowed.append(label)
+    allowed = [label for get, label in _PERM_FIELDS if get(perms)]
     if not allowed:
         return "Разрешения по умолчанию: запрещено все"
     return "Разрешения по умолчанию: " + ", ".join(allowed)
 
 
 def extract_custom_emoji_ids(message: Message) -> list[str]:
-    entities = []
-    if message.entities:
-        entities.extend(message.entities)
-    if message.caption_entities:
-        entities.extend(message.caption_entities)
-
-    ids: list[str] = []
-    for entity in entities:
-        entity_type = getattr(entity.type, "value", entity.type)
-        if entity_type == "custom_emoji":
-            custom_id = getattr(entity, "custom_emoji_id", None)
-            if custom_id:
-                ids.append(custom_id)
-    return ids
+    entities = chain(message.entities or (), message.caption_entities or ())
+    return [
+        entity.custom_emoji_id
+        for entity in entities
+        if entity.type == MessageEntityType.CUSTOM_EMOJI and entity.custom_emoji_id
+    ]
 
 
 async def safe_get_member_count(bot: Bot, chat_id: int) -> Optional[int]:
@@ -149,14 +291,33 @@ async def safe_get_member_count(bot: Bot, chat_id: int) -> Optional[int]:
     return None
 
 
-async def safe_get_admins(bot: Bot, chat_id: int) -> list[ChatMember]:
+class _GetChatAdministratorsRaw(GetChatAdministrators):
+    """getChatAdministrators, который оставляет элементы ответа обычными dict."""
+
+    __returning__ = list[dict[str, Any]]
+
+
+async def safe_get_admins(
+    bot: Bot, chat_id: int, limit: int = ADMINS_SHOWN_LIMIT
+) -> tuple[int, list[User]]:
+    """Return the admin count and User objects for the first ``limit`` admins.
+
+    В супергруппе может быть до 50 админов, а выводим мы только первых
+    нескольких, поэтому модели строим лишь для них.
+    """
     try:
-        return await bot.get_chat_administrators(chat_id)
+        members = await bot(_GetChatAdministratorsRaw(chat_id=chat_id))
     except TelegramForbiddenError:
         logger.info("Нет прав читать администраторов")
     except TelegramBadRequest:
         logger.info("Не удалось получить администраторов")
-    return []
+    else:
+        shown = [
+            User.model_validate(member["user"], context={"bot": bot})
+            for member in members[:limit]
+        ]
+        return len(members), shown
+    return 0, []
 
 
 async def build_chat_info(
@@ -165,62 +326,99 @@ async def build_chat_info(
     thread_id: Optional[int] = None,
     is_topic_message: bool = False,
     message: Optional[Message] = None,
+    with_member_count: bool = True,
 ) -> str:
-    chat = await bot.get_chat(chat_id)
-    member_count = await safe_get_member_count(bot, chat_id)
-    admins = await safe_get_admins(bot, chat_id)
+    chat_text, is_forum = await _get_chat_part(bot, chat_id, with_member_count)
+    if not is_forum:
+        return chat_text
+
+    # Сведения о топике зависят от конкретного сообщения, поэтому их не кэшируем.
+    if is_topic_message and thread_id:
+        topic_info = await fetch_topic_info(bot, chat_id, thread_id, message)
+        return chat_text + "\n" + "\n".join(topic_info)
+    return (
+        chat_text + "\nФорумный режим включен. Запустите /info внутри конкретного топика, "
+        "чтобы вывести сведения о нем."
+    )
 
-    chat_type = chat.type.value if hasattr(chat.type, "value") else str(chat.type)
 
-    lines = [
-        f"ID: {chat.id}",
-        f"Тип: {chat_type}",
-    ]
+async def _get_chat_part(bot: Bot, chat_id: int, with_member_count: bool) -> tuple[str, bool]:
+    """Return the chat-level part of /info and whether the chat is a forum.
+
+    Результат кэшируется на CHAT_INFO_CACHE_TTL секунд; одновременные запросы
+    по одному чату ждут общий вызов Bot API вместо того, чтобы слать свои.
+    """
+    key = (chat_id, with_member_count)
+    cached = _CHAT_INFO_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    task = _CHAT_INFO_IN_FLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(_render_chat_part(bot, chat_id, with_member_count))
+        _CHAT_INFO_IN_FLIGHT[key] = task
+        task.add_done_callback(lambda t: _chat_info_done(key, t))
+    # shield: отмена одного ожидающего хендлера не должна отменять общий запрос.
+    return await asyncio.shield(task)
+
+
+def _chat_info_done(key: tuple, task: "asyncio.Task[tuple[str, bool]]") -> None:
+    _CHAT_INFO_IN_FLIGHT.pop(key, None)
+    if not task.cancelled() and task.exception() is None:
+        _CHAT_INFO_CACHE[key] = task.result()
+
+
+async def _render_chat_part(bot: Bot, chat_id: int, with_member_count: bool) -> tuple[str, bool]:
+    # Запросы независимы, поэтому шлем их параллельно. safe_get_* сами гасят
+    # ошибки прав, так что исключение может прийти только из get_chat.
+    if with_member_count:
+        chat, member_count, (admin_count, admins) = await asyncio.gather(
+            bot.get_chat(chat_id),
+            safe_get_member_count(bot, chat_id),
+            safe_get_admins(bot, chat_id),
+        )
+    else:
+        chat, (admin_count, admins) = await asyncio.gather(
+            bot.get_chat(chat_id), safe_get_admins(bot, chat_id)
+        )
+        member_count = None
+
+    buf = io.StringIO()
+    w = buf.write
+    w(f"ID: {chat.id}\n")
+    w(f"Тип: {chat.type}\n")
     if chat.title:
-        lines.append(f"Название: {chat.title}")
+        w(f"Название: {chat.title}\n")
     if chat.username:
-        lines.append(f"Публичное имя: @{chat.username}")
+        w(f"Публичное имя: @{chat.username}\n")
     if chat.description:
-        lines.append(f"Описание: {chat.description}")
+        w(f"Описание: {chat.description}\n")
     if chat.bio:
-        lines.append(f"Био: {chat.bio}")
+        w(f"Био: {chat.bio}\n")
     if chat.invite_link:
-        lines.append(f"Инвайт-линк: {chat.invite_link}")
-
-    lines.extend(
-        [
-            f"Защита контента: {yes_no(chat.has_protected_content)}",
-            f"Скрытые участники: {yes_no(chat.has_hidden_members)}",
-            f"Private forwards: {yes_no(chat.has_private_forwards)}",
-            f"Aggressive anti-spam: {yes_no(chat.has_aggressive_anti_spam_enabled)}",
-            f"Join-to-send: {yes_no(chat.join_to_send_messages)}",
-            f"Join-by-request: {yes_no(chat.join_by_request)}",
-            f"Форум включен: {yes_no(chat.is_forum)}",
-        ]
-    )
+        w(f"Инвайт-линк: {chat.invite_link}\n")
+
+    w(f"Защита контента: {_YN_MAP[chat.has_protected_content]}\n")
+    w(f"Скрытые участники: {_YN_MAP[chat.has_hidden_members]}\n")
+    w(f"Private forwards: {_YN_MAP[chat.has_private_forwards]}\n")
+    w(f"Aggressive anti-spam: {_YN_MAP[chat.has_aggressive_anti_spam_enabled]}\n")
+    w(f"Join-to-send: {_YN_MAP[chat.join_to_send_messages]}\n")
+    w(f"Join-by-request: {_YN_MAP[chat.join_by_request]}\n")
+    w(f"Форум включен: {_YN_MAP[chat.is_forum]}\n")
 
     if chat.linked_chat_id:
-        lines.append(f"Связанный чат ID: {chat.linked_chat_id}")
+        w(f"Связанный чат ID: {chat.linked_chat_id}\n")
     if chat.active_usernames:
-        lines.append("Доп. юзернеймы: " + ", ".join(f"@{u}" for u in chat.active_usernames))
+        w("Доп. юзернеймы: " + ", ".join(f"@{u}" for u in chat.active_usernames) + "\n")
 
     if member_count is not None:
-        lines.append(f"Участников: {member_count}")
+        w(f"Участников: {member_count}\n")
 
-    lines.append(format_permissions(chat))
-    lines.append(format_admins(admins))
+    w(format_permissions(chat) + "\n")
+    w(format_admins(admin_count, admins) + "\n")
 
-    if chat.is_forum:
-        if is_topic_message and thread_id:
-            topic_info = await fetch_topic_info(bot, chat_id, thread_id, message)
-            lines.extend(topic_info)
-        else:
-            lines.append(
-                "Форумный режим включен. Запустите /info внутри конкретного топика, "
-                "чтобы вывести сведения о нем."
-            )
-
-    return "\n".join(lines)
+    # Каждая строка пишется с \n на конце, последний перевод строки лишний.
+    return buf.getvalue()[:-1], bool(chat.is_forum)
 
 
 async def fetch_topic_info(
@@ -270,25 +468,22 @@ async def handle_error(event: ErrorEvent, bot: Bot) -> bool:
     """Global error handler: не даем боту упасть и шлем уведомление владельцу."""
 
     exc = event.exception
-    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    timestamp = _utcstamp()
 
-    update_dump = ""
+    preview = ""
     if event.update:
         try:
-            if hasattr(event.update, "model_dump"):
-                raw = event.update.model_dump(exclude_none=True, by_alias=True)
-            elif hasattr(event.update, "dict"):
-                raw = event.update.dict(exclude_none=True)
-            else:
-                raw = str(event.update)
-            update_dump = f"Update: {raw}"
+            # Сериализуем сразу в bytes (то же, что model_dump_json, но без
+            # промежуточной str) и режем по байтам: хвост обрезанного
+            # UTF-8-символа отбрасывается при декодировании.
+            update = event.update
+            raw = update.__pydantic_serializer__.to_json(update, exclude_none=True, by_alias=True)
+            preview = "Update: " + raw[:UPDATE_PREVIEW_LIMIT].decode("utf-8", "ignore")
+            if len(raw) > UPDATE_PREVIEW_LIMIT:
+                preview += "…"
         except Exception:
             logger.debug("Не удалось сериализовать update для отчета", exc_info=True)
 
-    preview = update_dump
-    if len(preview) > 1500:
-        preview = preview[:1500] + "…"
-
     report = "\n".join(
         part for part in [
             f"⚠️ Ошибка {timestamp}",
@@ -297,21 +492,65 @@ async def handle_error(event: ErrorEvent, bot: Bot) -> bool:
         ] if part
     )
 
-    await notify_owner(bot, report)
+    notify_owner(report)
     logger.exception("Исключение в обработчике", exc_info=exc)
     return True
 
 
+_PRIVATE_COMMANDS = [
+    BotCommand(command="start", description="Показать справку"),
+    BotCommand(command="info", description="Информация о себе"),
+]
+_GROUP_COMMANDS = [BotCommand(command="info", description="Информация о чате")]
+
+# Группы и админы получают один и тот же список; отправки по разным scope
+# независимы и идут параллельно.
+_COMMAND_SCOPES = (
+    ("all_private_chats", _PRIVATE_COMMANDS, BotCommandScopeAllPrivateChats()),
+    ("all_group_chats", _GROUP_COMMANDS, BotCommandScopeAllGroupChats()),
+    ("all_chat_administrators", _GROUP_COMMANDS, BotCommandScopeAllChatAdministrators()),
+)
+
+
+def _commands_hash(bot: Bot, scope_name: str, commands: list[BotCommand]) -> str:
+    payload = (bot.id, scope_name, [(c.command, c.description) for c in commands])
+    return hashlib.blake2b(repr(payload).encode()).hexdigest()
+
+
+def _load_commands_cache() -> dict[str, str]:
+    try:
+        data = json.loads(COMMANDS_CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_commands_cache(cache: dict[str, str]) -> None:
+    try:
+        COMMANDS_CACHE_PATH.write_text(json.dumps(cache), encoding="utf-8")
+    except OSError:
+        logger.warning("Не удалось сохранить кэш команд в %s", COMMANDS_CACHE_PATH)
+
+
 async def set_commands(bot: Bot) -> None:
-    private_commands = [
-        BotCommand(command="start", description="Показать справку"),
-        BotCommand(command="info", description="Информация о себе"),
-    ]
-    group_commands = [BotCommand(command="info", description="Информация о чате")]
+    """Publish command lists, skipping scopes whose payload has not changed."""
+
+    cache = _load_commands_cache()
+    pending = []
+    for scope_name, commands, scope in _COMMAND_SCOPES:
+        digest = _commands_hash(bot, scope_name, commands)
+        if cache.get(scope_name) != digest:
+            pending.append((scope_name, digest, commands, scope))
+
+    if not pending:
+        logger.info("Команды не изменились, set_my_commands пропущен")
+        return
 
-    await bot.set_my_commands(private_commands, scope=BotCommandScopeAllPrivateChats())
-    await bot.set_my_commands(group_commands, scope=BotCommandScopeAllGroupChats())
-    await bot.set_my_commands(group_commands, scope=BotCommandScopeAllChatAdministrators())
+    await asyncio.gather(
+        *(bot.set_my_commands(commands, scope=scope) for _, _, commands, scope in pending)
+    )
+    cache.update((scope_name, digest) for scope_name, digest, _, _ in pending)
+    _save_commands_cache(cache)
 
 
 async def start_private(message: Message) -> None:
@@ -347,7 +586,9 @@ async def info_group(message: Message, bot: Bot) -> None:
 
 
 async def info_channel(message: Message, bot: Bot) -> None:
-    text = await build_chat_info(bot=bot, chat_id=message.chat.id)
+    # В каналах get_chat_member_count бывает медленным или запрещенным, поэтому
+    # счетчик участников не запрашиваем.
+    text = await build_chat_info(bot=bot, chat_id=message.chat.id, with_member_count=False)
     await message.answer(text)
 
 
@@ -356,7 +597,15 @@ async def custom_emoji_id_private(message: Message) -> None:
     if not ids:
         return
 
-    unique_ids = list(dict.fromkeys(ids))
+    if len(ids) == 1:
+        unique_ids = ids
+    else:
+        seen: set[str] = set()
+        unique_ids = []
+        for custom_id in ids:
+            if custom_id not in seen:
+                seen.add(custom_id)
+                unique_ids.append(custom_id)
     if len(unique_ids) == 1:
         text = f"ID кастомной emoji: {unique_ids[0]}"
     else:
@@ -364,42 +613,80 @@ async def custom_emoji_id_private(message: Message) -> None:
     await message.answer(text)
 
 
+_GROUP_TYPES = frozenset({ChatType.GROUP, ChatType.SUPERGROUP})
+
+_F_PRIVATE = F.chat.type == ChatType.PRIVATE
+_F_GROUPS = F.chat.type.in_(_GROUP_TYPES)
+_F_CHANNEL = F.chat.type == ChatType.CHANNEL
+_CMD_START = CommandStart()
+_CMD_INFO = Command("info")
+
+
+def create_session() -> AiohttpSession:
+    """aiohttp session tuned to keep TLS connections to api.telegram.org alive."""
+    session = AiohttpSession()
+    # aiogram не дает передать параметры TCPConnector через конструктор, поэтому
+    # дополняем его настройки (ssl-контекст по умолчанию сохраняется).
+    session._connector_init.update(
+        limit=100,
+        limit_per_host=50,
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+    )
+    return session
+
+
 async def main() -> None:
     token = os.getenv("BOT_TOKEN")
     if not token:
         raise RuntimeError("BOT_TOKEN не найден в окружении")
 
-    bot = Bot(token=token)
+    bot = Bot(token=token, session=create_session())
     dp = Dispatcher()
 
     # Register handlers
-    dp.message.register(start_private, CommandStart(), F.chat.type == ChatType.PRIVATE)
-    dp.message.register(info_private, Command("info"), F.chat.type == ChatType.PRIVATE)
-    dp.message.register(custom_emoji_id_private, F.chat.type == ChatType.PRIVATE)
-    dp.message.register(
-        info_group,
-        Command("info"),
-        F.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP}),
-    )
-    dp.message.register(info_channel, Command("info"), F.chat.type == ChatType.CHANNEL)
-    dp.channel_post.register(info_channel, Command("info"))  # команды из постов канала
+    dp.message.register(start_private, _CMD_START, _F_PRIVATE)
+    dp.message.register(info_private, _CMD_INFO, _F_PRIVATE)
+    dp.message.register(custom_emoji_id_private, _F_PRIVATE)
+    dp.message.register(info_group, _CMD_INFO, _F_GROUPS)
+    dp.message.register(info_channel, _CMD_INFO, _F_CHANNEL)
+    dp.channel_post.register(info_channel, _CMD_INFO)  # команды из постов канала
     dp.errors.register(handle_error)
 
     await bot.delete_webhook(drop_pending_updates=True)
     await set_commands(bot)
 
-    while True:
-        try:
-            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
-        except KeyboardInterrupt:
-            logger.info("Остановка по Ctrl+C")
-            break
-        except Exception as exc:  # noqa: BLE001 - хотим перезапускать при любой ошибке
-            timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-            msg = f"⚠️ Polling упал {timestamp}\n{type(exc).__name__}: {exc}"
-            await notify_owner(bot, msg)
-            logger.exception("Polling упал, перезапуск через 5 секунд", exc_info=exc)
-            await asyncio.sleep(5)
+    allowed_updates = dp.resolve_used_update_types()
+    delay = POLLING_RETRY_MIN_DELAY
+
+    notify_task = asyncio.create_task(notify_owner_worker(bot)) if OWNER_ID else None
+
+    try:
+        while True:
+            started = asyncio.get_running_loop().time()
+            try:
+                await dp.start_polling(bot, allowed_updates=allowed_updates)
+            except KeyboardInterrupt:
+                logger.info("Остановка по Ctrl+C")
+                break
+            except Exception as exc:  # noqa: BLE001 - хотим перезапускать при любой ошибке
+                # Если polling успел поработать дольше максимальной паузы, считаем
+                # сбой новым и начинаем отсчет задержки заново.
+                if asyncio.get_running_loop().time() - started > POLLING_RETRY_MAX_DELAY:
+                    delay = POLLING_RETRY_MIN_DELAY
+                timestamp = _utcstamp()
+                msg = f"⚠️ Polling упал {timestamp}\n{type(exc).__name__}: {exc}"
+                notify_owner(msg)
+                logger.exception("Polling упал, перезапуск через %s секунд", delay, exc_info=exc)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, POLLING_RETRY_MAX_DELAY)
+    finally:
+        if notify_task:
+            notify_task.cancel()
+            try:
+                await asyncio.wait_for(notify_task, NOTIFY_SHUTDOWN_TIMEOUT)
+            except (asyncio.CancelledError, TimeoutError):
+                pass
 
 
 if __name__ == "__main__":